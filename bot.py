@@ -2,18 +2,22 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import os
+import json
+import hashlib
 from dotenv import load_dotenv
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
+COMMAND_HASH_FILE = "command_tree.hash"
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "").lower() in ("1", "true", "yes")
 
 intents = discord.Intents.default()
-intents.message_content = True
 intents.guilds = True
 intents.members = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = commands.Bot(command_prefix=commands.when_mentioned, intents=intents)
 
 reaction_roles = {}
+embed_button_view = None
 
 @bot.tree.command(name="purge", description="Delete messages from the channel")
 @app_commands.describe(
@@ -47,14 +51,16 @@ async def purge(
         )
     else:
         await interaction.response.send_message(
-            f"🗑️ Deleting messages...",
+            "🗑️ Deleting messages...",
             ephemeral=True
         )
     
     try:
         if user:
+            user_id = user.id
+
             def check_user(message):
-                return message.author.id == user.id
+                return message.author.id == user_id
             
             deleted = await interaction.channel.purge(limit=amount * 2, check=check_user)
             deleted_count = len(deleted)
@@ -83,63 +89,150 @@ async def purge(
             ephemeral=True
         )
 
+class ButtonView(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="🔗 Click Me", style=discord.ButtonStyle.green, custom_id="embedbutton:click")
+    async def button_click(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_message("✅ You clicked the button!", ephemeral=True)
+
 @bot.tree.command(name="embedbutton", description="Send an embed with a clickable button")
 @app_commands.describe(channel="Channel to post the embed", title="Embed title", message="Embed message")
 async def embedbutton(interaction: discord.Interaction, channel: discord.TextChannel, title: str, message: str):
-    class ButtonView(discord.ui.View):
-        @discord.ui.button(label="🔗 Click Me", style=discord.ButtonStyle.green)
-        async def button_click(self, button: discord.ui.Button, interaction: discord.Interaction):
-            await interaction.response.send_message("✅ You clicked the button!", ephemeral=True)
-
+    await interaction.response.defer(ephemeral=True)
     embed = discord.Embed(title=title, description=message, color=discord.Color.green())
-    await channel.send(embed=embed, view=ButtonView())
-    await interaction.response.send_message("✅ Embed with button sent.", ephemeral=True)
+    try:
+        await channel.send(embed=embed, view=embed_button_view)
+    except discord.Forbidden:
+        await interaction.followup.send(
+            "❌ I don't have permission to send messages in that channel.",
+            ephemeral=True
+        )
+        return
+    except discord.HTTPException as e:
+        await interaction.followup.send(
+            f"❌ An error occurred: {e}",
+            ephemeral=True
+        )
+        return
+    await interaction.followup.send("✅ Embed with button sent.", ephemeral=True)
 
 @bot.tree.command(name="reactionrole", description="Create a reaction role message")
 @app_commands.describe(channel="Channel to post message", emoji="Emoji to react with", role="Role to assign")
 async def reactionrole(interaction: discord.Interaction, channel: discord.TextChannel, emoji: str, role: discord.Role):
-    message = await channel.send(
-        embed=discord.Embed(
-            title="🎭 Reaction Role",
-            description=f"React with {emoji} to get the {role.mention} role.",
-            color=discord.Color.orange()
+    await interaction.response.defer(ephemeral=True)
+    try:
+        message = await channel.send(
+            embed=discord.Embed(
+                title="🎭 Reaction Role",
+                description=f"React with {emoji} to get the {role.mention} role.",
+                color=discord.Color.orange()
+            )
+        )
+    except discord.Forbidden:
+        await interaction.followup.send(
+            "❌ I don't have permission to send messages in that channel.",
+            ephemeral=True
         )
-    )
-    await message.add_reaction(emoji)
+        return
+    except discord.HTTPException as e:
+        await interaction.followup.send(
+            f"❌ An error occurred: {e}",
+            ephemeral=True
+        )
+        return
+    try:
+        await message.add_reaction(emoji)
+    except discord.HTTPException as e:
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            pass
+        await interaction.followup.send(
+            f"❌ Could not add the reaction: {e}",
+            ephemeral=True
+        )
+        return
     reaction_roles[message.id] = {"emoji": emoji, "role_id": role.id}
-    await interaction.response.send_message("✅ Reaction role set.", ephemeral=True)
+    await interaction.followup.send("✅ Reaction role set.", ephemeral=True)
+
+def resolve_reaction_role(payload: discord.RawReactionActionEvent):
+    if payload.user_id == bot.user.id:
+        return None, None
+    data = reaction_roles.get(payload.message_id)
+    if not data or str(payload.emoji) != data["emoji"]:
+        return None, None
+    guild = bot.get_guild(payload.guild_id)
+    if guild is None:
+        return None, None
+    member = payload.member or guild.get_member(payload.user_id)
+    return guild.get_role(data["role_id"]), member
 
 @bot.event
 async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
-    if payload.message_id in reaction_roles:
-        data = reaction_roles[payload.message_id]
-        if str(payload.emoji) == data["emoji"]:
-            guild = bot.get_guild(payload.guild_id)
-            role = guild.get_role(data["role_id"])
-            member = guild.get_member(payload.user_id)
-            if member and role:
-                await member.add_roles(role)
-                print(f"✅ Added {role.name} to {member.display_name}")
+    role, member = resolve_reaction_role(payload)
+    if member and role:
+        await member.add_roles(role)
+        print(f"✅ Added {role.name} to {member.display_name}")
 
 @bot.event
 async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
-    if payload.message_id in reaction_roles:
-        data = reaction_roles[payload.message_id]
-        if str(payload.emoji) == data["emoji"]:
-            guild = bot.get_guild(payload.guild_id)
-            role = guild.get_role(data["role_id"])
-            member = guild.get_member(payload.user_id)
-            if member and role:
-                await member.remove_roles(role)
-                print(f"❌ Removed {role.name} from {member.display_name}")
+    role, member = resolve_reaction_role(payload)
+    if member and role:
+        await member.remove_roles(role)
+        print(f"❌ Removed {role.name} from {member.display_name}")
+
+def command_tree_hash():
+    payload = {
+        "application_id": bot.application_id,
+        "commands": [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    }
+    data = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+@bot.event
+async def setup_hook():
+    global embed_button_view
+    bot.add_view(ButtonView())
+    # The view registered above, with no message id, handles embedbutton:click
+    # on every message. embedbutton sends a *different* instance, stopped up
+    # front. This relies on an undocumented discord.py detail:
+    # Messageable.send() only calls store_view() for views that are not
+    # is_finished(), so the stopped copy still renders its button but adds no
+    # per-message entry. Those entries never expire with timeout=None. If
+    # send() ever stores finished views too, go back to sending ButtonView().
+    embed_button_view = ButtonView()
+    embed_button_view.stop()
+
+    tree_hash = command_tree_hash()
+    try:
+        with open(COMMAND_HASH_FILE) as f:
+            synced_hash = f.read().strip()
+    except FileNotFoundError:
+        synced_hash = None
+
+    if FORCE_COMMAND_SYNC or tree_hash != synced_hash:
+        try:
+            await bot.tree.sync()
+        except discord.HTTPException as e:
+            print(f"❌ Failed to sync application commands: {e}")
+        else:
+            with open(COMMAND_HASH_FILE, "w") as f:
+                f.write(tree_hash)
+            print("✅ Synced application commands.")
 
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
     print(f"✅ Logged in as {bot.user} | Ready on {len(bot.guilds)} servers.")
 
 if __name__ == "__main__":
     if not TOKEN:
         print("❌ DISCORD_TOKEN missing in .env")
     else:
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            pass
         bot.run(TOKEN)